@@ -1,28 +1,50 @@
 import streamlit as st
 import requests
-import pandas as pd
+from requests.adapters import HTTPAdapter
+import urllib3
+from urllib3.util.retry import Retry
+import asyncio
+import threading
 import time
-import gspread
-from google.oauth2.service_account import Credentials
-try:
-    from gspread.exceptions import SpreadsheetNotFound, APIError
-except Exception:
-    from gspread import SpreadsheetNotFound, APIError
+import ijson
 
 # --- 楽天 Books API 設定 ---
 API_ENDPOINT = "https://app.rakuten.co.jp/services/api/BooksBook/Search/20170404"
+# 同時に発行するAPIリクエストの上限
+MAX_CONCURRENT_REQUESTS = 5
+# APIリクエストの最小送信間隔（秒）
+# 楽天APIの制限はアプリケーションIDごとに1秒1リクエスト
+MIN_REQUEST_INTERVAL = 1.0
+# 通信エラー・一時的なエラー時の再試行回数
+MAX_RETRIES = 3
+# 楽天ブックスのジャンルID（漫画・コミック）
+COMIC_GENRE_ID = "001001"
+# 検索結果から取り出す書籍の項目
+BOOK_FIELDS = ("title", "isbn", "salesDate", "itemPrice", "publisherName")
+# 検索結果の表示列
+RESULT_COLUMNS = ("タイトル", "ISBN", "出版日", "価格", "出版社")
+# 追加待ちの行がこの件数に達したら自動でスプレッドシートに反映する
+PENDING_ROWS_FLUSH_SIZE = 10
+
+# Google Sheets認証（認証済みクライアントはrerun間で再利用）
+@st.cache_resource(ttl=3000, show_spinner=False)
+def authorize_gspread():
+    # 検索だけの場合は読み込まないよう、初回のスプレッドシート操作時にimportする
+    import gspread
+    from google.oauth2.service_account import Credentials
+    
+    creds = Credentials.from_service_account_info(
+        st.secrets["gcp_service_account"],
+        scopes=[
+            "https://www.googleapis.com/auth/spreadsheets",
+            "https://www.googleapis.com/auth/drive.readonly"
+        ]
+    )
+    return gspread.authorize(creds)
 
-# Google Sheets認証
 def get_gspread_client():
     try:
-        creds = Credentials.from_service_account_info(
-            st.secrets["gcp_service_account"],
-            scopes=[
-                "https://www.googleapis.com/auth/spreadsheets",
-                "https://www.googleapis.com/auth/drive.readonly"
-            ]
-        )
-        return gspread.authorize(creds)
+        return authorize_gspread()
     except KeyError as e:
         st.error(f"設定エラー: Google Cloud認証情報が見つかりません。\nエラー詳細: {e}")
         return None
@@ -30,17 +52,29 @@ def get_gspread_client():
         st.error(f"Google Sheets認証でエラーが発生しました: {e}")
         return None
 
+# ワークシートの取得（ハンドルはrerun間で再利用）
+@st.cache_resource(ttl=3000, show_spinner=False)
+def open_worksheet(spreadsheet_name):
+    return authorize_gspread().open(spreadsheet_name).sheet1  # 最初のシートを使用
+
+def get_worksheet():
+    """
+    secretsで指定されたスプレッドシートの最初のシートを返す
+    認証に失敗した場合はNoneを返す
+    """
+    if get_gspread_client() is None:
+        return None
+    
+    # スプレッドシート名をsecretsから取得
+    spreadsheet_name = st.secrets["env"]["sheet_name"]
+    return open_worksheet(spreadsheet_name)
+
 # スプレッドシートから既存データを取得する機能
 def get_existing_records():
     try:
-        gc = get_gspread_client()
-        if gc is None:
+        worksheet = get_worksheet()
+        if worksheet is None:
             return []
-            
-        # スプレッドシート名をsecretsから取得
-        spreadsheet_name = st.secrets["env"]["sheet_name"]
-        spreadsheet = gc.open(spreadsheet_name)
-        worksheet = spreadsheet.sheet1  # 最初のシートを使用
         
         # 全てのレコードを取得
         records = worksheet.get_all_records()
@@ -64,64 +98,89 @@ def check_duplicate_title(title, existing_records):
     return False
 
 # スプレッドシートへの書き込み機能
-def add_to_spreadsheet(title, search_title, volume):
+def add_rows_to_spreadsheet(rows):
+    """
+    複数の行を1回のAPI呼び出しでまとめて追加する
+    """
     try:
-        gc = get_gspread_client()
-        if gc is None:
+        worksheet = get_worksheet()
+        if worksheet is None:
             return False
-            
-        # スプレッドシート名をsecretsから取得
-        spreadsheet_name = st.secrets["env"]["sheet_name"]
-        spreadsheet = gc.open(spreadsheet_name)
-        worksheet = spreadsheet.sheet1  # 最初のシートを使用
         
-        # 新しい行を追加
-        new_row = [title, search_title, volume]
-        worksheet.append_row(new_row)
+        # 新しい行をまとめて追加
+        worksheet.append_rows(rows, value_input_option="RAW")
         
         return True
     except Exception as e:
         st.error(f"スプレッドシート書き込みエラー: {e}")
         return False
 
-# APIキー設定
-def get_api_keys():
-    import os
-    api_key = None
-    affiliate_id = None
+# 追加待ちの行をスプレッドシートに反映する機能
+def flush_pending_rows():
+    pending_rows = st.session_state.get('pending_rows', [])
+    if not pending_rows:
+        return True
     
-    # Streamlit secrets から取得
-    try:
-        api_key = st.secrets["rakuten"]["applicationId"]
-        affiliate_id = st.secrets["rakuten"]["affiliateId"]
-        st.success("✅ Streamlit secretsから設定を読み込みました")
-        return api_key, affiliate_id
-    except KeyError:
-        st.warning("⚠️ Streamlit secretsで楽天設定が見つかりません")
-    except Exception as e:
-        st.warning(f"⚠️ Streamlit secrets読み込みエラー: {e}")
+    with st.spinner(f"スプレッドシートに{len(pending_rows)}件を追加中..."):
+        success = add_rows_to_spreadsheet(pending_rows)
     
+    if success:
+        st.session_state.pending_rows = []
+    return success
+
+# 追加待ちの行を表示・反映する機能（サイドバー）
+def show_pending_rows():
+    with st.sidebar:
+        # 反映完了メッセージの表示
+        if st.session_state.get('flush_message'):
+            st.success(st.session_state.flush_message)
+            st.session_state.flush_message = None
+        
+        pending_rows = st.session_state.get('pending_rows', [])
+        if not pending_rows:
+            return
+        
+        st.subheader(f"📤 追加待ち: {len(pending_rows)}件")
+        st.dataframe(
+            [dict(zip(("タイトル", "検索用タイトル", "巻数"), row)) for row in pending_rows],
+            use_container_width=True
+        )
+        st.warning(
+            f"⚠️ 追加待ちの行はまだスプレッドシートに保存されていません。"
+            f"反映ボタンを押すか{PENDING_ROWS_FLUSH_SIZE}件たまるまで保存されず、"
+            f"ページを閉じたり再読み込みすると失われます。"
+        )
+        if st.button(f"📤 スプレッドシートに反映（{len(pending_rows)}件）", key="flush_pending_rows_button"):
+            if flush_pending_rows():
+                st.session_state.flush_message = "✅ スプレッドシートに追加されました！"
+                st.rerun()
+            else:
+                st.error("❌ スプレッドシートへの追加に失敗しました")
+
+# APIキー設定（secretsの読み込みはプロセスで1回だけ）
+@st.cache_resource(show_spinner=False)
+def get_api_keys():
+    # Streamlit secrets から取得
+    api_key = st.secrets["rakuten"]["applicationId"]
+    affiliate_id = st.secrets["rakuten"]["affiliateId"]
     return api_key, affiliate_id
 
-# 設定取得
+# 設定取得（取得できなかった場合はキャッシュされず、次のrerunで再試行）
 try:
     API_KEY, AFFILIATE_ID = get_api_keys()
+except KeyError:
+    API_KEY, AFFILIATE_ID = None, None
+    st.warning("⚠️ Streamlit secretsで楽天設定が見つかりません")
 except Exception as e:
-    st.error(f"設定エラー: {e}")
-    st.stop()
+    API_KEY, AFFILIATE_ID = None, None
+    st.warning(f"⚠️ Streamlit secrets読み込みエラー: {e}")
 
-def title_matches(book_title, search_title):
+def title_matches(book_title_lower, search_words):
     """
     タイトルが検索条件にマッチするかを判定する関数
     スペース区切りの単語がすべて含まれているかチェック
+    引数は小文字化済みのタイトルと、小文字化・分割済みの検索単語
     """
-    # 大文字小文字を統一して比較
-    book_title_lower = book_title.lower()
-    search_title_lower = search_title.lower()
-    
-    # 検索タイトルをスペースで分割
-    search_words = search_title_lower.split()
-    
     # すべての単語が本のタイトルに含まれているかチェック
     for word in search_words:
         if word not in book_title_lower:
@@ -129,55 +188,174 @@ def title_matches(book_title, search_title):
     
     return True
 
-def search_books_with_volume(title, volume_number, min_price=None, max_price=None, retries=3, max_pages=5):
+@st.cache_resource(show_spinner=False)
+def get_request_schedule():
+    """
+    直近のリクエスト送信時刻を保持する（全セッション・rerun間で共有）
+    APIの制限はアプリケーションID単位のため、プロセス全体で1つだけ持つ
+    """
+    return {"last_call": 0.0, "lock": threading.Lock()}
+
+def wait_for_rate_limit():
+    """
+    前回のリクエストから最小送信間隔が空くまで待機する
+    既に間隔が空いていれば待たない
+    """
+    schedule = get_request_schedule()
+    with schedule["lock"]:
+        now = time.monotonic()
+        delay = max(0.0, schedule["last_call"] + MIN_REQUEST_INTERVAL - now)
+        # 並行リクエストでも間隔が空くように、送信時刻を先に予約する
+        schedule["last_call"] = now + delay
+    time.sleep(delay)
+
+@st.cache_resource(show_spinner=False)
+def get_http_session():
+    """
+    楽天Books API用のHTTPセッションを作成する（全セッション・rerun間で共有）
+    接続を使い回してTLSハンドシェイクを省き、再試行はurllib3に任せる
+    """
+    session = requests.Session()
+    retry = Retry(
+        total=MAX_RETRIES,
+        backoff_factor=0.5,
+        status_forcelist=[429, 500, 502, 503, 504]
+    )
+    session.mount("https://", HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=MAX_CONCURRENT_REQUESTS,
+        max_retries=retry
+    ))
+    return session
+
+def parse_books(stream):
+    """
+    APIレスポンスをストリーム解析し、必要な項目だけを持つ書籍のリストと総ページ数を取り出す
+    使わない項目（画像URL・説明文など）は辞書に展開しない
+    """
+    item_prefix = "Items.item.Item."
+    books = []
+    book = None
+    page_count = 0
+    
+    for prefix, event, value in ijson.parse(stream):
+        if prefix == "pageCount":
+            page_count = int(value)
+        elif prefix == "Items.item":
+            if event == "start_map":
+                book = {}
+            elif event == "end_map":
+                books.append(book)
+        elif prefix.startswith(item_prefix):
+            field = prefix[len(item_prefix):]
+            if field in BOOK_FIELDS:
+                book[field] = value
+    
+    return {"pageCount": page_count, "Items": books}
+
+@st.cache_data(ttl=3600, max_entries=512, show_spinner=False)
+def _fetch_page(title, page, min_price, max_price, genre_id):
+    """
+    楽天Books APIから1ページ分の検索結果を取得する
+    同じ検索条件の結果はキャッシュされ、rerun時にAPIを再度呼ばない
+    """
+    params = {
+        'applicationId': API_KEY,
+        'affiliateId': AFFILIATE_ID,
+        'title': title,
+        'sort': '-releaseDate',
+        'hits': 30,
+        'page': page
+    }
+    
+    # 価格・ジャンルパラメータを動的に追加
+    if min_price is not None:
+        params['minPrice'] = min_price
+    if max_price is not None:
+        params['maxPrice'] = max_price
+    if genre_id is not None:
+        params['booksGenreId'] = genre_id
+    
+    wait_for_rate_limit()
+    with get_http_session().get(API_ENDPOINT, params=params, timeout=10, stream=True) as response:
+        # エラー時は例外を送出（失敗した結果はキャッシュされない）
+        response.raise_for_status()
+        # gzip等の圧縮を解除しながら読み込む
+        response.raw.decode_content = True
+        return parse_books(response.raw)
+
+async def fetch_page(title, page, min_price, max_price, genre_id, semaphore):
+    """
+    1ページ分の検索結果を取得する（再試行はHTTPセッション側で行う）
+    取得できなかった場合はNoneを返す
+    """
+    async with semaphore:
+        try:
+            # requestsはブロッキングなので別スレッドで実行
+            return await asyncio.to_thread(_fetch_page, title, page, min_price, max_price, genre_id)
+        except requests.exceptions.HTTPError as e:
+            st.error(f"ページ{page} エラー: {e.response.status_code}")
+        except (requests.exceptions.RequestException, urllib3.exceptions.HTTPError) as e:
+            # レスポンス本文を直接読むため、読み込み中の切断はurllib3の例外になる
+            st.error(f"ページ{page} 通信エラー: {e}")
+        except ijson.JSONError as e:
+            # メンテナンス画面などJSON以外の本文が返された場合
+            st.error(f"ページ{page} データ処理エラー: {e}")
+    
+    st.warning(f"ページ{page}のAPIが応答しませんでした。")
+    return None
+
+async def fetch_pages(title, min_price, max_price, genre_id, max_pages):
+    """
+    複数ページの検索結果を並行して取得する
+    1ページ目の総ページ数から、実際に存在するページだけを取得する
+    戻り値はページ順に並んだ検索結果のリスト
+    """
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+    first_page = await fetch_page(title, 1, min_price, max_price, genre_id, semaphore)
+    
+    # 1ページ目が取得できなかった場合は総ページ数が分からないため上限まで取得
+    if first_page is None:
+        page_count = max_pages
+    else:
+        page_count = min(first_page["pageCount"], max_pages)
+    
+    rest_pages = await asyncio.gather(*(
+        fetch_page(title, page, min_price, max_price, genre_id, semaphore)
+        for page in range(2, page_count + 1)
+    ))
+    return [first_page, *rest_pages]
+
+def search_books_with_volume(title, volume_number, *, min_price=None, max_price=None, max_pages=5):
     """
     タイトルで検索し、指定した巻数が含まれる書籍を抽出する
     最大5ページまで検索結果を取得
     APIパラメータ + クライアント側で価格帯に制限（二重チェック）
     """
     all_results = []
+    # 重複チェック用のISBN集合
+    seen_isbns = set()
     
-    # APIのタイトルパラメータ用（スペースをプラスに変換）
-    api_title = title.replace(' ', '+')
+    # 検索単語は一度だけ小文字化・分割しておく
+    search_words = tuple(title.lower().split())
+    # 巻数も照合する単語に加え、タイトルと巻数を1回の判定でチェックする
+    if volume_number:
+        search_words += (volume_number.lower(),)
     
-    # 各ページを順次取得
-    for page in range(1, max_pages + 1):
-        params = {
-            'applicationId': API_KEY,
-            'affiliateId': AFFILIATE_ID,
-            'title': api_title,
-            'sort': '-releaseDate',
-            'hits': 30,
-            'page': page
-        }
-        
-        # 価格パラメータを動的に追加
-        if min_price is not None:
-            params['minPrice'] = min_price
-        if max_price is not None:
-            params['maxPrice'] = max_price
+    # 巻数指定時は漫画ジャンルに絞ってAPI側で無関係な書籍を除外する
+    # （タイトルはそのまま渡し、スペースのエンコードはrequestsに任せる）
+    genre_id = COMIC_GENRE_ID if volume_number else None
+    
+    # 全ページを並行して取得
+    pages = asyncio.run(fetch_pages(title, min_price, max_price, genre_id, max_pages))
+    
+    for page, data in enumerate(pages, start=1):
+        if data is None:
+            continue
         
         page_results = []
         
-        for attempt in range(retries):
-            try:
-                response = requests.get(API_ENDPOINT, params=params, timeout=10)
-                if response.status_code == 200:
-                    break
-                else:
-                    st.error(f"ページ{page} エラー: {response.status_code} (試行 {attempt+1}/{retries})")
-            except requests.exceptions.RequestException as e:
-                st.error(f"ページ{page} 通信エラー: {e} (試行 {attempt+1}/{retries})")
-            
-            # エラー時は少し待って再試行
-            if attempt < retries - 1:
-                time.sleep(1)
-        else:
-            st.warning(f"ページ{page}のAPIが応答しませんでした。")
-            continue
-
         try:
-            data = response.json()
             books = data.get("Items", [])
             
             # このページに結果がない場合は終了
@@ -186,22 +364,34 @@ def search_books_with_volume(title, volume_number, min_price=None, max_price=Non
                 break
             
             # タイトルマッチングとフィルタリング
-            for book_item in books:
-                book = book_item["Item"]
-                book_title = book["title"]
-                
-                # まず、タイトルでフィルタリング
-                if not title_matches(book_title, title):
+            for book in books:
+                # 重複チェック（ISBNで判定）
+                # 文字列照合より先に行い、複数ページに出てくる書籍を早めに除外する
+                isbn = book["isbn"]
+                if isbn in seen_isbns:
                     continue
+                seen_isbns.add(isbn)
                 
-                # 巻数でフィルタリング
-                if volume_number and volume_number not in book_title:
+                book_title = book["title"]
+                book_title_lower = book_title.lower()
+                
+                # タイトルと巻数でフィルタリング
+                if not title_matches(book_title_lower, search_words):
                     continue
                 
                 # 価格フィルタリング（APIパラメータ + クライアント側での二重チェック）
-                item_price = book.get('itemPrice', 0)
-                try:
-                    price_value = int(item_price) if item_price else 0
+                item_price = book.get('itemPrice')
+                if min_price is None and max_price is None:
+                    # 価格指定がない場合は数値に変換せず、表示用の文字列だけ作る
+                    price_str = f"{item_price}円" if item_price else "不明"
+                else:
+                    # 価格が不明な場合は価格条件を判定できないためスキップ
+                    if not item_price:
+                        continue
+                    try:
+                        price_value = int(item_price)
+                    except (ValueError, TypeError):
+                        continue
                     
                     # 最低価格チェック
                     if min_price is not None and price_value < min_price:
@@ -210,33 +400,23 @@ def search_books_with_volume(title, volume_number, min_price=None, max_price=Non
                     # 最高価格チェック
                     if max_price is not None and price_value > max_price:
                         continue
-                        
-                except (ValueError, TypeError):
-                    # 価格が不明な場合はスキップ
-                    continue
-                
-                # 条件を満たす書籍を結果に追加
-                book_data = {
-                    "タイトル": book_title,
-                    "ISBN": book["isbn"],
-                    "出版日": book["salesDate"],
-                    "価格": f"{price_value}円",
-                    "出版社": book.get("publisherName", "不明")
-                }
+                    
+                    price_str = f"{price_value}円"
                 
-                # 重複チェック（ISBNで判定）
-                if not any(result["ISBN"] == book_data["ISBN"] for result in all_results):
-                    page_results.append(book_data)
+                # 条件を満たす書籍を結果に追加（RESULT_COLUMNSの順のタプル）
+                page_results.append((
+                    book_title,
+                    isbn,
+                    book["salesDate"],
+                    price_str,
+                    book.get("publisherName", "不明")
+                ))
             
             all_results.extend(page_results)
             
             # このページで取得した件数を表示
             if page_results:
                 st.info(f"ページ{page}: {len(page_results)}件の書籍を取得")
-            
-            # API制限を考慮して少し待機
-            if page < max_pages:
-                time.sleep(0.5)
                 
         except Exception as e:
             st.error(f"ページ{page} データ処理エラー: {e}")
@@ -245,7 +425,8 @@ def search_books_with_volume(title, volume_number, min_price=None, max_price=Non
     if not all_results:
         st.warning("該当する本が見つかりませんでした。")
     
-    return all_results
+    # 最後にまとめて列名付きの辞書に変換
+    return [dict(zip(RESULT_COLUMNS, row)) for row in all_results]
 
 def main():
     st.title("📚 新規書籍検索")
@@ -329,7 +510,12 @@ def main():
         
         # 検索実行
         with st.spinner("検索中... (最大5ページまで検索します)"):
-            results = search_books_with_volume(title.strip(), volume_number.strip(), min_price_value, max_price_value)
+            results = search_books_with_volume(
+                title.strip(),
+                volume_number.strip(),
+                min_price=min_price_value,
+                max_price=max_price_value
+            )
         
         # 検索結果をセッション状態に保存
         st.session_state.current_results = results
@@ -340,19 +526,20 @@ def main():
     
     # セッション状態から検索結果を表示
     if st.session_state.get('has_search_results', False) and 'current_results' in st.session_state:
-        results = st.session_state.current_results
+        # セッション状態は一度だけ参照してローカル変数で使い回す
+        ss = st.session_state
+        results = ss.current_results
         
         # 結果表示
         st.subheader("📊 検索結果")
         
         if results:
-            df = pd.DataFrame(results)
-            st.dataframe(df, use_container_width=True)
+            st.dataframe(results, use_container_width=True)
             st.success(f"✅ {len(results)}件の書籍が見つかりました！")
             
             # 検索結果の要約（セッション状態から取得）
-            current_title = st.session_state.get('current_title', '')
-            current_volume = st.session_state.get('current_volume', '')
+            current_title = ss.get('current_title', '')
+            current_volume = ss.get('current_volume', '')
             
             if current_volume:
                 st.info(f"「{current_title}」の{current_volume}巻に関連する書籍を表示しています（最大5ページまで検索）")
@@ -362,13 +549,12 @@ def main():
             # スプレッドシート追加セクション
             st.subheader("📝 スプレッドシートに追加")
             
-            # セッション状態の初期化
-            if 'selected_book_index' not in st.session_state:
-                st.session_state.selected_book_index = 0
+            # 前回選択していた書籍（未選択時は先頭）
+            prev_book_index = ss.get('selected_book_index', 0)
             
             # 選択可能な範囲をチェック
-            if st.session_state.selected_book_index >= len(results):
-                st.session_state.selected_book_index = 0
+            if prev_book_index >= len(results):
+                prev_book_index = 0
             
             # レコード選択（フォーム外で実行）
             book_options = [f"{i+1}. {result['タイトル']}" for i, result in enumerate(results)]
@@ -376,16 +562,16 @@ def main():
                 "追加する書籍を選択してください",
                 options=range(len(results)),
                 format_func=lambda x: book_options[x],
-                index=st.session_state.selected_book_index,
+                index=prev_book_index,
                 help="スプレッドシートに追加したい書籍を選択してください",
                 key="book_selector"
             )
             
             # 選択が変更されたかどうかをチェック
-            book_selection_changed = (st.session_state.selected_book_index != selected_book_index)
+            book_selection_changed = (prev_book_index != selected_book_index)
             
             # 選択が変更されたらセッション状態を更新
-            st.session_state.selected_book_index = selected_book_index
+            ss.selected_book_index = selected_book_index
             
             # 選択された書籍の情報を表示
             selected_book = results[selected_book_index]
@@ -395,13 +581,13 @@ def main():
             st.subheader("📋 追加する情報")
             
             # 成功フラグでフィールドをクリア、または選択変更時にフィールドを更新
-            clear_fields = st.session_state.get('clear_input_fields', False)
+            clear_fields = ss.get('clear_input_fields', False)
             update_fields = book_selection_changed or clear_fields
             
             # デフォルト値を設定
             default_title = "" if clear_fields else selected_book['タイトル']
             default_search_title = "" if clear_fields else selected_book['タイトル']  
-            default_volume = "" if clear_fields else st.session_state.get('current_volume', '')
+            default_volume = "" if clear_fields else current_volume
             
             sheet_title = st.text_input(
                 "タイトル *（必須）",
@@ -426,12 +612,15 @@ def main():
             
             # クリアフラグをリセット
             if clear_fields:
-                st.session_state.clear_input_fields = False
+                ss.clear_input_fields = False
             
             # 成功メッセージの表示
-            if st.session_state.get('show_success_message', False):
-                st.success("✅ スプレッドシートに追加されました！")
-                st.session_state.show_success_message = False
+            if ss.get('success_message'):
+                st.success(ss.success_message)
+                ss.success_message = None
+            
+            # 追加待ちの行（まとめてスプレッドシートに書き込む）
+            pending_rows = ss.setdefault('pending_rows', [])
             
             # 追加ボタン
             if st.button("📝 スプレッドシートに追加", key="add_to_sheet_button"):
@@ -447,21 +636,33 @@ def main():
                     with st.spinner("既存データを確認中..."):
                         existing_records = get_existing_records()
                     
+                    # 追加待ちの行のタイトル
+                    pending_records = [{'タイトル': row[0]} for row in pending_rows]
+                    
                     # 重複チェック
                     if check_duplicate_title(sheet_title.strip(), existing_records):
                         st.warning(f"⚠️ 「{sheet_title.strip()}」は既にスプレッドシートに存在します。追加をスキップしました。")
+                    elif check_duplicate_title(sheet_title.strip(), pending_records):
+                        st.warning(f"⚠️ 「{sheet_title.strip()}」は既に追加待ちです。サイドバーの反映ボタンでスプレッドシートに保存してください。")
                     else:
-                        with st.spinner("スプレッドシートに追加中..."):
-                            success = add_to_spreadsheet(
-                                sheet_title.strip(),
-                                sheet_search_title.strip(),
-                                sheet_volume.strip()
-                            )
+                        pending_rows.append([
+                            sheet_title.strip(),
+                            sheet_search_title.strip(),
+                            sheet_volume.strip()
+                        ])
+                        
+                        # 一定件数たまったらまとめて書き込む
+                        if len(pending_rows) >= PENDING_ROWS_FLUSH_SIZE:
+                            success = flush_pending_rows()
+                            message = "✅ スプレッドシートに追加されました！"
+                        else:
+                            success = True
+                            message = f"✅ 追加待ちリストに追加しました（{len(pending_rows)}件）"
                         
                         if success:
-                            # 成功時はフィールドクリアフラグと成功メッセージフラグを設定
-                            st.session_state.clear_input_fields = True
-                            st.session_state.show_success_message = True
+                            # 成功時はフィールドクリアフラグと成功メッセージを設定
+                            ss.clear_input_fields = True
+                            ss.success_message = message
                             st.rerun()
                         else:
                             st.error("❌ スプレッドシートへの追加に失敗しました")
@@ -479,6 +680,9 @@ def main():
             - 例：「ONE PIECE」と入力すると、「ONE」と「PIECE」両方を含む書籍のみが表示されます
             """)
 
+    # 追加待ちの行（検索結果の有無に関わらず表示）
+    show_pending_rows()
+    
     # デバッグ情報
     with st.expander("🔧 デバッグ情報"):
         st.write("**API設定状況:**")